@@ -1,24 +1,83 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from typing import List
-import tempfile
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import AsyncIterator, List, Tuple
+import logging
 import os
+import orjson
+from app.core.config import get_settings
 from app.models.schemas import DocumentAnalysis, HTTPError
-from app.services.analyzers.openrouter_analyzer import OpenRouterAnalyzer
-from app.services.document_processor import DocumentProcessor
+from app.services.document_processor import AnalysisUnavailableError, DocumentProcessor
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-def get_document_processor():
-    """Dependency for document processor with OpenRouter analyzer."""
-    analyzer = OpenRouterAnalyzer()
-    return DocumentProcessor(analyzer)
+# Response detail when no clause of a document could be analyzed
+ANALYSIS_UNAVAILABLE_DETAIL = "Clause analysis is temporarily unavailable. Please try again later."
+
+# Leading bytes expected for each accepted extension (DOCX files are ZIP archives)
+FILE_SIGNATURES = {
+    '.pdf': b'%PDF-',
+    '.docx': b'PK\x03\x04',
+}
+
+def get_document_processor(request: Request) -> DocumentProcessor:
+    """Dependency returning the shared document processor created at startup."""
+    return request.app.state.processor
+
+async def read_upload(file: UploadFile) -> Tuple[str, bytes]:
+    """Validate an uploaded document and read it into memory.
+    
+    Returns:
+        The lowercased file extension and the file contents
+    
+    Raises:
+        HTTPException: 400 for unsupported or mismatched files, 413 if the file is too large
+    """
+    # Validate file type
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+    
+    file_ext = os.path.splitext(file.filename)[-1].lower()
+    if file_ext not in ['.pdf', '.docx']:
+        raise HTTPException(
+            status_code=400, 
+            detail="Unsupported file type. Please upload a PDF or DOCX file."
+        )
+    
+    # The body has already been spooled by the time the handler runs; requests with an
+    # oversized Content-Length are rejected earlier by the limit_upload_size middleware.
+    # This check still covers uploads sent without a Content-Length.
+    max_upload_bytes = get_settings().MAX_UPLOAD_BYTES
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum size is {max_upload_bytes // (1024 * 1024)} MB."
+    )
+    if file.size is not None and file.size > max_upload_bytes:
+        raise too_large
+    
+    # Check the file signature before loading the spooled file into memory
+    head = await file.read(8)
+    if not head.startswith(FILE_SIGNATURES[file_ext]):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File content does not match the {file_ext} format."
+        )
+    
+    # Read the whole file in one call, so there is a single in-memory copy
+    await file.seek(0)
+    data = await file.read()
+    if len(data) > max_upload_bytes:
+        raise too_large
+    return file_ext, data
 
 @router.post(
     "",
     response_model=DocumentAnalysis,
     responses={
         400: {"model": HTTPError, "description": "Invalid file format or content"},
-        500: {"model": HTTPError, "description": "Internal server error"}
+        413: {"model": HTTPError, "description": "Uploaded file is too large"},
+        500: {"model": HTTPError, "description": "Internal server error"},
+        503: {"model": HTTPError, "description": "No clause could be analyzed"}
     }
 )
 async def analyze_document(
@@ -31,37 +90,72 @@ async def analyze_document(
     - **file**: Legal document in PDF or DOCX format
     - **returns**: Analysis of the document including risk scores and suggestions
     """
-    # Validate file type
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No file provided")
-    
-    file_ext = os.path.splitext(file.filename)[-1].lower()
-    if file_ext not in ['.pdf', '.docx']:
-        raise HTTPException(
-            status_code=400, 
-            detail="Unsupported file type. Please upload a PDF or DOCX file."
-        )
-    
-    # Save the uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-        contents = await file.read()
-        temp_file.write(contents)
-        temp_path = temp_file.name
+    file_ext, data = await read_upload(file)
     
     try:
         # Process the document
-        result = await processor.process_document(temp_path)
+        result = await processor.process_document_bytes(data, file_ext)
         return result
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
+    except AnalysisUnavailableError as e:
+        logger.error(f"Document analysis unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=ANALYSIS_UNAVAILABLE_DETAIL)
     
-    finally:
-        # Clean up the temporary file
+    except Exception:
+        logger.exception("process_document failed")
+        return ORJSONResponse(status_code=500, content={"detail": "Internal server error"})
+
+@router.post(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": "One JSON clause analysis per line, then a line with overall_risk"
+        },
+        400: {"model": HTTPError, "description": "Invalid file format or content"},
+        413: {"model": HTTPError, "description": "Uploaded file is too large"},
+        500: {"model": HTTPError, "description": "Internal server error"},
+        503: {"model": HTTPError, "description": "No clause could be analyzed"}
+    }
+)
+async def analyze_document_stream(
+    file: UploadFile = File(..., description="Legal document to analyze (PDF or DOCX)"),
+    processor: DocumentProcessor = Depends(get_document_processor)
+):
+    """
+    Analyze a legal document, streaming each clause analysis as it completes.
+    
+    - **file**: Legal document in PDF or DOCX format
+    - **returns**: Newline-delimited JSON: one clause analysis per line, in
+      completion order with a ``position`` that sorts into document order, then
+      ``{"overall_risk": ...}``, or ``{"detail": ...}`` if analysis fails midway
+    """
+    file_ext, data = await read_upload(file)
+    stream = processor.stream_document_bytes(data, file_ext)
+    
+    # Wait for the first result so extraction errors still get a proper status code
+    try:
+        first = await stream.__anext__()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        logger.exception("process_document failed")
+        return ORJSONResponse(status_code=500, content={"detail": "Internal server error"})
+    
+    async def lines() -> AsyncIterator[bytes]:
+        yield orjson.dumps(first) + b"\n"
         try:
-            os.unlink(temp_path)
-        except:
-            pass
+            async for item in stream:
+                yield orjson.dumps(item) + b"\n"
+        except AnalysisUnavailableError as e:
+            logger.error(f"Document analysis unavailable: {str(e)}")
+            yield orjson.dumps({"detail": ANALYSIS_UNAVAILABLE_DETAIL}) + b"\n"
+        except Exception:
+            logger.exception("process_document failed")
+            yield orjson.dumps({"detail": "Internal server error"}) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
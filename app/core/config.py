@@ -1,9 +1,16 @@
 import logging
+import logging.config
+import logging.handlers
+import queue
 import sys
 from pathlib import Path
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+# Queue shared by the QueueHandler and the background QueueListener
+LOG_QUEUE = queue.Queue(-1)
 
 # Logging configuration
 LOGGING_CONFIG = {
@@ -19,55 +26,120 @@ LOGGING_CONFIG = {
         },
     },
     "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "stream": sys.stdout,
-            "formatter": "verbose",
-            "level": "DEBUG"
-        },
-        "file": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "filename": "app.log",
-            "maxBytes": 10485760,  # 10MB
-            "backupCount": 5,
-            "formatter": "verbose",
-            "level": "DEBUG"
+        # Records are only enqueued on the request path; the console and file
+        # handlers built in setup_logging() drain the queue on a background thread
+        "queue": {
+            "()": "logging.handlers.QueueHandler",
+            "queue": LOG_QUEUE,
         },
     },
     "loggers": {
         "": {  # root logger
-            "handlers": ["console", "file"],
+            "handlers": ["queue"],
             "level": "DEBUG",
             "propagate": True
         },
         "app": {
-            "handlers": ["console", "file"],
+            "handlers": ["queue"],
             "level": "DEBUG",
             "propagate": False
         },
         "uvicorn": {
-            "handlers": ["console", "file"],
+            "handlers": ["queue"],
             "level": "INFO",
             "propagate": False
         },
         "uvicorn.error": {
             "level": "INFO"
         },
+        # Access lines come from the log_requests middleware instead
         "uvicorn.access": {
-            "handlers": ["console", "file"],
-            "level": "INFO",
+            "handlers": ["queue"],
+            "level": "WARNING",
             "propagate": False
         }
     }
 }
 
-def setup_logging():
-    """Configure logging for the application."""
+# Logging in extraction worker processes, which cannot reach the parent's queue listener
+WORKER_LOGGING_CONFIG = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "verbose": LOGGING_CONFIG["formatters"]["verbose"],
+    },
+    "handlers": {
+        "stderr": {
+            "class": "logging.StreamHandler",
+            "stream": "ext://sys.stderr",
+            "formatter": "verbose",
+            "level": "WARNING",
+        },
+    },
+    "loggers": {
+        "": {
+            "handlers": ["stderr"],
+            "level": "WARNING"
+        },
+        # Drop any queue handlers inherited from the parent and log through the root
+        "app": {
+            "handlers": [],
+            "level": "WARNING",
+            "propagate": True
+        },
+        "uvicorn": {
+            "handlers": [],
+            "level": "WARNING",
+            "propagate": True
+        }
+    }
+}
+
+# Background listener writing queued records; created by setup_logging()
+log_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging() -> logging.Logger:
+    """Configure logging for the application.
+    
+    Loggers write to a QueueHandler; the console and rotating file handlers
+    are attached to ``log_listener``, which must be started (and stopped on
+    shutdown) by the application.
+    """
+    global log_listener
     logging.config.dictConfig(LOGGING_CONFIG)
+    
+    verbose = LOGGING_CONFIG["formatters"]["verbose"]
+    formatter = logging.Formatter(verbose["format"], datefmt=verbose["datefmt"])
+    
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(formatter)
+    console.setLevel(logging.DEBUG)
+    
+    file_handler = logging.handlers.RotatingFileHandler(
+        "app.log",
+        maxBytes=268435456,  # 256MB
+        backupCount=3
+    )
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(logging.DEBUG)
+    
+    log_listener = logging.handlers.QueueListener(
+        LOG_QUEUE, console, file_handler, respect_handler_level=True
+    )
+    
     logger = logging.getLogger(__name__)
     logger.info("Logging is configured")
     return logger
 
+def setup_worker_logging() -> None:
+    """Configure logging in an extraction worker process.
+    
+    Used as the process pool initializer: records logged in a worker are
+    never drained by the parent's ``log_listener``, so workers write
+    warnings and errors straight to stderr instead of queueing them.
+    """
+    logging.config.dictConfig(WORKER_LOGGING_CONFIG)
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Legal Document Analyzer"
     API_V1_STR: str = "/api/v1"
@@ -83,28 +155,38 @@ class Settings(BaseSettings):
     OPENROUTER_URL: str = "https://openrouter.ai/api/v1/chat/completions"
     OPENROUTER_MODEL: str = "google/gemma-3n-e4b-it:free"
     OPENROUTER_VERIFY_SSL: bool = True
+    OPENROUTER_MAX_CONNECTIONS: int = 500
+    OPENROUTER_MAX_KEEPALIVE: int = 200
+    OPENROUTER_MAX_CONCURRENCY: int = 20
+    OPENROUTER_BATCH_SIZE: int = 20
+    OPENROUTER_MAX_RETRIES: int = 3
+    OPENROUTER_MAX_TOKENS: int = 256
+    OPENROUTER_CACHE_SIZE: int = 10000
+    OPENROUTER_CACHE_TTL: int = 86400  # 24 hours
+    OPENROUTER_CACHE_DB: str = "clause_cache.db"  # Empty to keep the cache in memory only
+    OPENROUTER_PREFILTER: bool = True  # Skip the API for short clauses without risk keywords
     
     # API Configuration
     DEBUG: bool = False
+    MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024  # 20 MiB
+    CORS_ORIGINS: List[str] = ["*"]
+    
+    # Clause splitting: compiled regex by default, spaCy sentencizer when enabled
+    USE_SPACY_SPLITTER: bool = False
+    
+    # PDF text extraction backend: "pymupdf" (fast) or "pdfplumber" (layout-aware)
+    PDF_BACKEND: str = "pymupdf"
+    
+    # Worker processes for document text extraction; 0 extracts in a thread instead
+    EXTRACTION_PROCESSES: int = 0
     
-    class Config:
-        env_file = ".env"
-        env_file_encoding = 'utf-8'
-        case_sensitive = True
-        
-        @classmethod
-        def customise_sources(
-            cls,
-            init_settings,
-            env_settings,
-            file_secret_settings,
-        ):
-            # Configure logging as early as possible
-            import logging.config
-            logging.config.dictConfig(LOGGING_CONFIG)
-            logger = logging.getLogger(__name__)
-            logger.debug("Configuring settings...")
-            
-            return env_settings, init_settings, file_secret_settings
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=True
+    )
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """Return the process-wide settings, loaded on first use."""
+    return Settings()
@@ -1,16 +1,28 @@
 import logging
+import multiprocessing
 import sys
-import traceback
+import time
+from concurrent.futures import ProcessPoolExecutor
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-from app.core.config import settings, setup_logging
+from fastapi.responses import ORJSONResponse
+from app.core import config
+from app.core.config import get_settings, setup_logging, setup_worker_logging
 from app.api.api_v1.api import api_router
-import spacy
+from app.services.analyzers.openrouter_analyzer import OpenRouterAnalyzer
+from app.services.document_processor import DocumentProcessor, build_sentence_pipeline
+from app.services.http import close_client, get_client
 
 # Configure logging
 logger = setup_logging()
+settings = get_settings()
+
+# Maximum number of request body characters echoed back on validation errors
+MAX_BODY_PREVIEW = 512
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
 
 def create_application() -> FastAPI:
     logger.info("Creating FastAPI application")
@@ -21,53 +33,74 @@ def create_application() -> FastAPI:
         description="API for analyzing legal documents",
         version="1.0.0",
         openapi_url=f"{settings.API_V1_STR}/openapi.json",
-        debug=settings.DEBUG
+        debug=settings.DEBUG,
+        default_response_class=ORJSONResponse
     )
     
     # Set up CORS middleware
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=["*"],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
+        allow_origins=settings.CORS_ORIGINS,
+        allow_credentials=False,
+        allow_methods=["GET", "POST"],
+        allow_headers=["content-type", "authorization"],
+        max_age=86400,  # Let browsers cache preflight responses for a day
     )
     
     # Include API router
     app.include_router(api_router, prefix=settings.API_V1_STR)
     
+    # Reject oversized uploads from their Content-Length, before the body is received and parsed
+    @app.middleware("http")
+    async def limit_upload_size(request: Request, call_next):
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit():
+            if int(content_length) > settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+                return ORJSONResponse(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    content={
+                        "detail": f"File too large. Maximum size is "
+                                  f"{settings.MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+                    },
+                )
+        return await call_next(request)
+    
     # Add middleware for request logging
     @app.middleware("http")
     async def log_requests(request: Request, call_next):
-        logger.info(f"Request: {request.method} {request.url}")
-        logger.debug(f"Headers: {dict(request.headers)}")
-        
+        start_time = time.perf_counter()
         try:
             response = await call_next(request)
-            logger.info(f"Response status: {response.status_code}")
+            logger.info(
+                "%s %s %d %.1fms",
+                request.method, request.url.path, response.status_code,
+                (time.perf_counter() - start_time) * 1000
+            )
             return response
         except Exception as e:
-            logger.error(f"Request failed: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("Request failed: %s", e)
             raise
     
     # Add exception handlers
     @app.exception_handler(Exception)
     async def global_exception_handler(request: Request, exc: Exception):
-        logger.error(f"Unhandled exception: {str(exc)}")
-        logger.error(traceback.format_exc())
-        return JSONResponse(
+        logger.exception("Unhandled exception: %s", exc)
+        return ORJSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"detail": "Internal server error"},
         )
     
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request: Request, exc: RequestValidationError):
-        logger.error(f"Request validation error: {exc}")
-        logger.error(f"Request body: {await request.body()}")
-        return JSONResponse(
+        logger.error("Request validation error: %s", exc.errors())
+        # Use the body captured during validation (never re-read the request) and truncate it
+        if isinstance(exc.body, (bytes, bytearray)):
+            body_preview = bytes(exc.body[:MAX_BODY_PREVIEW]).decode("utf-8", errors="replace")
+        else:
+            body_preview = str(exc.body)[:MAX_BODY_PREVIEW]
+        return ORJSONResponse(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            content={"detail": exc.errors(), "body": exc.body},
+            content={"detail": exc.errors(), "body_preview": body_preview},
         )
     
     logger.info("FastAPI application created successfully")
@@ -76,36 +109,55 @@ def create_application() -> FastAPI:
 # Create the FastAPI application
 app = create_application()
 
-# Load spaCy model at startup
+# Build shared resources at startup
 @app.on_event("startup")
 async def startup_event():
+    config.log_listener.start()
     logger.info("Starting up application...")
     
-    try:
-        logger.info("Loading spaCy model...")
-        nlp = spacy.load("en_core_web_sm")
-        logger.info("spaCy model loaded successfully")
-    except OSError as e:
-        logger.warning("spaCy model not found, downloading...")
+    nlp = None
+    if settings.USE_SPACY_SPLITTER:
         try:
-            import os
-            logger.info("Downloading spaCy model...")
-            os.system("python -m spacy download en_core_web_sm")
-            nlp = spacy.load("en_core_web_sm")
-            logger.info("spaCy model downloaded and loaded successfully")
+            logger.info("Building spaCy sentence pipeline...")
+            nlp = build_sentence_pipeline()
+            logger.info("spaCy pipeline ready")
         except Exception as e:
-            logger.error(f"Failed to download or load spaCy model: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("Failed to build spaCy pipeline: %s", e)
             raise
-    except Exception as e:
-        logger.error(f"Unexpected error loading spaCy model: {str(e)}")
-        logger.error(traceback.format_exc())
-        raise
+    
+    # Build the analyzer and processor once so the model and pooled HTTP client are reused
+    app.state.nlp = nlp
+    app.state.analyzer = OpenRouterAnalyzer(client=get_client())
+    
+    # Extract CPU-heavy documents in separate processes when configured
+    app.state.extraction_pool = None
+    if settings.EXTRACTION_PROCESSES > 0:
+        logger.info(f"Starting {settings.EXTRACTION_PROCESSES} extraction processes")
+        # Spawn rather than fork: the parent already runs the log listener and executor threads
+        app.state.extraction_pool = ProcessPoolExecutor(
+            max_workers=settings.EXTRACTION_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=setup_worker_logging
+        )
+    
+    app.state.processor = DocumentProcessor(
+        app.state.analyzer,
+        nlp=app.state.nlp,
+        executor=app.state.extraction_pool
+    )
     
     logger.info("Application startup complete")
 
 # Shutdown event handler
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
     logger.info("Application shutting down...")
-    # Add any cleanup code here
+    analyzer = getattr(app.state, "analyzer", None)
+    if analyzer is not None:
+        await analyzer.aclose()
+    extraction_pool = getattr(app.state, "extraction_pool", None)
+    if extraction_pool is not None:
+        extraction_pool.shutdown(cancel_futures=True)
+    await close_client()
+    config.log_listener.stop()
+
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 
 class ClauseAnalysisBase(BaseModel):
@@ -15,7 +15,8 @@ class DocumentAnalysis(BaseModel):
 class HTTPError(BaseModel):
     detail: str
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {"detail": "Error message"},
         }
+    )
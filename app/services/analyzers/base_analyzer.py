@@ -1,9 +1,13 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, List, Union
 
 class BaseClauseAnalyzer(ABC):
     """Abstract base class for clause analyzers."""
     
+    # Maximum number of analyze_clause calls in flight in analyze_clauses
+    max_concurrency: int = 10
+    
     @abstractmethod
     async def analyze_clause(self, clause: str) -> Dict[str, Any]:
         """Analyze a single clause and return the analysis results.
@@ -16,3 +20,27 @@ class BaseClauseAnalyzer(ABC):
             clause, risk_score, explanation, clause_type, safer_version
         """
         pass
+    
+    async def analyze_clauses(self, clauses: List[str]) -> List[Union[Dict[str, Any], Exception]]:
+        """Analyze several clauses, preserving their order.
+        
+        The default implementation runs analyze_clause concurrently,
+        with at most ``max_concurrency`` calls in flight.
+        
+        Args:
+            clauses: The clause texts to analyze.
+            
+        Returns:
+            List with one entry per clause: the analysis dict, or the
+            exception raised while analyzing that clause.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def analyze_one(clause: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.analyze_clause(clause)
+        
+        return await asyncio.gather(
+            *(analyze_one(clause) for clause in clauses),
+            return_exceptions=True
+        )
@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+import orjson
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK_SIZE = 500
+
+class ClauseCache:
+    """Cache of clause analyses keyed by model and normalized clause text.
+    
+    Lookups hit an in-memory TTL cache first and fall back to an optional
+    SQLite database, so analyses of recurring boilerplate clauses survive
+    restarts. Database access runs on a dedicated thread so queries and
+    commits never block the event loop.
+    """
+    
+    def __init__(self, model: str, maxsize: int, ttl: int, db_path: Optional[str] = None):
+        """
+        Initialize the cache.
+        
+        Args:
+            model: Model name; results from other models are never returned
+            maxsize: Maximum number of entries kept in memory
+            ttl: Entry lifetime in seconds
+            db_path: SQLite database file for persistence, or None to disable it
+        """
+        self.model = model
+        self.ttl = ttl
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS clause_analysis ("
+                    " model TEXT NOT NULL,"
+                    " clause_hash TEXT NOT NULL,"
+                    " result BLOB NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " PRIMARY KEY (model, clause_hash))"
+                )
+                self._db.commit()
+                logger.info(f"Clause cache persisted to {db_path}")
+            except sqlite3.Error as e:
+                logger.warning(f"Clause cache database unavailable, using memory only: {str(e)}")
+                self._db = None
+    
+        if self._db is not None:
+            # A single worker serializes all access to the connection
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clause-cache")
+            # Reads already ignore expired rows; delete them so the file stops growing
+            self._executor.submit(self._purge)
+    
+    @staticmethod
+    def _key(clause: str) -> str:
+        """Hash the whitespace- and case-normalized clause text."""
+        return hashlib.blake2b(clause.strip().lower().encode(), digest_size=16).hexdigest()
+    
+    async def get(self, clause: str) -> Optional[Dict[str, Any]]:
+        """Return the cached analysis for a clause, or None."""
+        return (await self.get_many([clause]))[0]
+    
+    async def get_many(self, clauses: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Return the cached analysis (or None) for each clause, with one database query for the misses."""
+        keys = [self._key(clause) for clause in clauses]
+        found = {}
+        for key in keys:
+            result = self._memory.get(key)
+            if result is not None:
+                found[key] = result
+        
+        missing = list({key for key in keys if key not in found})
+        if missing and self._db is not None:
+            loaded = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._load, missing
+            )
+            for key, result in loaded.items():
+                self._memory[key] = result
+            found.update(loaded)
+        
+        return [
+            {**found[key], "clause": clause} if key in found else None
+            for clause, key in zip(clauses, keys)
+        ]
+    
+    async def set(self, clause: str, result: Dict[str, Any]) -> None:
+        """Store a successful analysis for a clause."""
+        await self.set_many([(clause, result)])
+    
+    async def set_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Store successful analyses, persisting them with a single commit."""
+        rows = []
+        for clause, result in items:
+            key = self._key(clause)
+            self._memory[key] = result
+            rows.append((key, result))
+        if rows and self._db is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._store, rows)
+    
+    def close(self) -> None:
+        """Wait for pending database work and close the connection, if any."""
+        if self._executor is not None:
+            self._executor.submit(self._db.close)
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._db = None
+    
+    def _load(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        try:
+            for start in range(0, len(keys), _LOOKUP_CHUNK_SIZE):
+                chunk = keys[start:start + _LOOKUP_CHUNK_SIZE]
+                rows = self._db.execute(
+                    "SELECT clause_hash, result FROM clause_analysis"
+                    f" WHERE model = ? AND created_at >= ? AND clause_hash IN ({','.join('?' * len(chunk))})",
+                    (self.model, time.time() - self.ttl, *chunk)
+                ).fetchall()
+                results.update((key, orjson.loads(result)) for key, result in rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Clause cache lookup failed: {str(e)}")
+        return results
+    
+    def _store(self, rows: List[Tuple[str, Dict[str, Any]]]) -> None:
+        now = time.time()
+        try:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO clause_analysis VALUES (?, ?, ?, ?)",
+                [(self.model, key, orjson.dumps(result), now) for key, result in rows]
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Clause cache write failed: {str(e)}")
+    
+    def _purge(self) -> None:
+        try:
+            deleted = self._db.execute(
+                "DELETE FROM clause_analysis WHERE created_at < ?",
+                (time.time() - self.ttl,)
+            ).rowcount
+            self._db.commit()
+            if deleted:
+                logger.info(f"Purged {deleted} expired clause cache entries")
+        except sqlite3.Error as e:
+            logger.warning(f"Clause cache purge failed: {str(e)}")
@@ -1,59 +1,159 @@
-import json
+import asyncio
 import logging
 import os
+import random
+import re
 import time
-import traceback
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Union
 
 import httpx
+import orjson
+from pydantic import TypeAdapter
 
 from ..analyzers.base_analyzer import BaseClauseAnalyzer
-from app.core.config import settings
+from ..analyzers.clause_cache import ClauseCache
+from app.core.config import get_settings
+from app.services.http import get_client
+from app.models.schemas import ClauseAnalysisBase
 
 logger = logging.getLogger(__name__)
 
+# Status codes worth retrying: request timeout, rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Keyword stems that mark a clause as worth a full analysis. Only the presence
+# of a stem matters, so the pattern stops at the stem instead of consuming the word.
+INTERESTING_RE = re.compile(
+    r'\b(?:indemn|liab|terminat|warrant|confidential|arbitrat|waiv|govern|breach|damag|exclusiv)',
+    re.I
+)
+
+# Clauses at least this long are always analyzed, keywords or not
+PREFILTER_MAX_LENGTH = 300
+
+# Validates the fields assembled from the LLM response (e.g. risk_score bounds) once
+_CLAUSE_ADAPTER = TypeAdapter(ClauseAnalysisBase)
+
+# What the model is asked to assess for every clause
+_ANALYSIS_CRITERIA = """1. Risk score (0-5, where 0 is no risk and 5 is high risk)
+2. Brief explanation of the risk
+3. Clause type (e.g., 'Liability', 'Confidentiality', 'Termination', 'Governing Law', 'Indemnification')
+4. A safer rewritten version of the clause"""
+
+# JSON schema of one clause analysis, enforced through structured outputs
+_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "risk_score": {"type": "number"},
+        "explanation": {"type": "string"},
+        "clause_type": {"type": "string"},
+        "safer_version": {"type": "string"}
+    },
+    "required": ["risk_score", "explanation", "clause_type", "safer_version"],
+    "additionalProperties": False
+}
+
+_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "clause_analysis", "strict": True, "schema": _ANALYSIS_SCHEMA}
+}
+
+# Structured outputs need an object at the top level, so batches are wrapped in "analyses"
+_BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "clause_analyses",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "analyses": {
+                    "type": "array",
+                    "items": {
+                        **_ANALYSIS_SCHEMA,
+                        "properties": {"i": {"type": "integer"}, **_ANALYSIS_SCHEMA["properties"]},
+                        "required": ["i", *_ANALYSIS_SCHEMA["required"]]
+                    }
+                }
+            },
+            "required": ["analyses"],
+            "additionalProperties": False
+        }
+    }
+}
+
 class OpenRouterAnalyzer(BaseClauseAnalyzer):
     """Clause analyzer using OpenRouter API."""
     
-    def __init__(self):
+    # Fixed prompt text around the clause(s), concatenated at call time
+    _PROMPT_HEAD = """You are a legal document analysis assistant. Analyze the following legal clause and provide:
+
+""" + _ANALYSIS_CRITERIA + """
+
+Clause to analyze:
+"""
+    _PROMPT_TAIL = "\n\nJSON Response:"
+
+    _BATCH_PROMPT_HEAD = """You are a legal document analysis assistant. Analyze each of the following numbered legal clauses and provide for each:
+
+""" + _ANALYSIS_CRITERIA + """
+
+Return one analysis per clause, with i set to the clause number.
+
+Clauses to analyze:
+"""
+    
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        """Initialize the analyzer, optionally with an injected HTTP client."""
         logger.info("Initializing OpenRouterAnalyzer")
         
         try:
+            settings = get_settings()
             self.api_key = settings.OPENROUTER_API_KEY
             self.api_url = settings.OPENROUTER_URL
             self.model = settings.OPENROUTER_MODEL
+            self.max_concurrency = settings.OPENROUTER_MAX_CONCURRENCY
+            self.batch_size = settings.OPENROUTER_BATCH_SIZE
+            # Shared by all analyze_clauses calls so concurrent documents/pages respect one limit
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.max_retries = settings.OPENROUTER_MAX_RETRIES
+            self.max_tokens = settings.OPENROUTER_MAX_TOKENS
+            self.prefilter = settings.OPENROUTER_PREFILTER
+            # Successful analyses keyed by model and normalized clause text
+            self._cache = ClauseCache(
+                model=self.model,
+                maxsize=settings.OPENROUTER_CACHE_SIZE,
+                ttl=settings.OPENROUTER_CACHE_TTL,
+                db_path=settings.OPENROUTER_CACHE_DB or None
+            )
             # Debug: API key presence, prefix, and length
-            logger.info(f"[DEBUG] API Key loaded: {'set' if self.api_key else 'NOT set'}")
+            logger.debug("API Key loaded: %s", 'set' if self.api_key else 'NOT set')
             if self.api_key:
-                logger.info(f"[DEBUG] API Key prefix: {self.api_key[:8]}")
-                logger.info(f"[DEBUG] API Key length: {len(self.api_key)}")
+                logger.debug("API Key prefix: %s, length: %d", self.api_key[:8], len(self.api_key))
             # Get SSL verification setting, default to True if not set
             self.verify_ssl = getattr(settings, 'OPENROUTER_VERIFY_SSL', True)
-            logger.info(f"[DEBUG] SSL verification: {'enabled' if self.verify_ssl else 'disabled'}")
+            logger.debug("SSL verification: %s", 'enabled' if self.verify_ssl else 'disabled')
             if not self.api_key:
                 error_msg = "OpenRouter API key is not configured"
                 logger.error(error_msg)
                 raise ValueError(error_msg)
             logger.info(f"OpenRouterAnalyzer initialized with model: {self.model}")
-            # Create a persistent client with connection pooling
-            self.client = httpx.AsyncClient(
-                timeout=60.0,
-                verify=self.verify_ssl,
-                limits=httpx.Limits(
-                    max_keepalive_connections=5,
-                    max_connections=10
-                )
-            )
+            # Use the shared pooled client unless one is injected
+            self.client = client or get_client()
+            self.headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "Referer": "http://localhost:8001",  # Correct header name for OpenRouter
+                "X-Title": "Legal Document Analyzer"  # Optional: Identify your app
+            }
         except Exception as e:
-            logger.error(f"Failed to initialize OpenRouterAnalyzer: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("Failed to initialize OpenRouterAnalyzer: %s", e)
             raise
-            
-    async def __aenter__(self):
-        return self
-        
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+    
+    async def aclose(self):
+        """Release resources owned by the analyzer (the HTTP client is shared)."""
+        # Waits for pending cache writes, so keep it off the event loop
+        await asyncio.to_thread(self._cache.close)
     
     async def analyze_clause(self, clause: str) -> Dict[str, Any]:
         """
@@ -65,135 +165,317 @@ class OpenRouterAnalyzer(BaseClauseAnalyzer):
         Returns:
             Dict containing analysis with keys: clause, risk_score, explanation, 
             clause_type, safer_version
+        
+        Raises:
+            ValueError: If the response cannot be parsed or validated
+            TimeoutError: If the API request times out
+            httpx.HTTPStatusError: If the API request fails
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Analyzing clause: %s...", clause[:100])
+        
+        if self._is_boilerplate(clause):
+            return self._boilerplate_result(clause)
+        
+        # Boilerplate clauses recur across documents; reuse earlier analyses
+        cached = await self._cache.get(clause)
+        if cached is not None:
+            logger.debug("Clause analysis served from cache")
+            return cached
+        
+        prompt = self._build_prompt(clause)
+        content = await self._complete(prompt, self.max_tokens, _RESPONSE_FORMAT)
+                    
+        try:
+            analysis = orjson.loads(content)
+        except orjson.JSONDecodeError as e:
+            error_msg = f"Failed to parse API response as JSON: {str(e)}"
+            logger.error(f"{error_msg}. Raw response: {content}")
+            raise ValueError(f"{error_msg}. Raw response: {content}") from e
+        
+        result = self._build_result(clause, analysis)
+        await self._cache.set(clause, result)
+        return result
+    
+    def _build_result(self, clause: str, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build and validate the analysis result for a clause.
+        
+        Args:
+            clause: The analyzed clause text
+            analysis: Parsed JSON object returned by the model for this clause
+            
+        Returns:
+            Dict with keys: clause, risk_score, explanation, clause_type, safer_version
+        
+        Raises:
+            ValueError: If a schema field is missing or invalid, so that a
+                non-conforming reply is reported as an error and never cached
         """
-        logger.debug(f"Analyzing clause: {clause[:100]}...")
-        start_time = time.time()
+        try:
+            result = {
+                "clause": clause,
+                "risk_score": float(analysis["risk_score"]),
+                "explanation": analysis["explanation"],
+                "clause_type": analysis["clause_type"],
+                "safer_version": analysis["safer_version"]
+            }
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Analysis is missing or has an invalid field: {e!r}") from e
+        _CLAUSE_ADAPTER.validate_python(result)
+        
+        logger.debug(
+            "Analysis complete. Risk score: %s, Type: %s",
+            result['risk_score'], result['clause_type']
+        )
+        return result
+    
+    async def _complete(self, prompt: str, max_tokens: int, response_format: Dict[str, Any]) -> str:
+        """
+        Send a prompt to the OpenRouter chat completions API.
+        
+        Args:
+            prompt: The user prompt to send
+            max_tokens: Upper bound on completion tokens
+            response_format: Structured output format the reply must follow
+            
+        Returns:
+            The message content of the first choice
+        """
+        start_time = time.perf_counter()
         
         # Ensure the client is still connected
         if self.client.is_closed:
             logger.warning("HTTP client was closed, recreating...")
-            self.client = httpx.AsyncClient(verify=self.verify_ssl)
+            self.client = get_client()
         
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.3,
+            "max_tokens": max_tokens,
+            "response_format": response_format
+        }
+        if logger.isEnabledFor(logging.DEBUG):
+            # Log headers with redacted API key
+            redacted_headers = {k: (v[:8] + '...' if k == 'Authorization' else v) for k, v in self.headers.items()}
+            logger.debug("Request headers: %s", redacted_headers)
+            logger.debug("Request payload: %s", orjson.dumps(payload).decode())
+        logger.debug("Sending request to OpenRouter API (model: %s)", self.model)
         try:
-            prompt = self._build_prompt(clause)
-            logger.debug("Built prompt for OpenRouter API")
+            response = await self._post_with_retry(payload)
+            response_time = time.perf_counter() - start_time
+            logger.debug("OpenRouter API response status: %s (%.2fs)", response.status_code, response_time)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response headers: %s", dict(response.headers))
+                logger.debug("Raw API response: %s", response.text)
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-                "Referer": "http://localhost:8001",  # Correct header name for OpenRouter
-                "X-Title": "Legal Document Analyzer"  # Optional: Identify your app
-            }
-            # Debug: Log headers with redacted API key
-            redacted_headers = {k: (v[:8] + '...' if k == 'Authorization' else v) for k, v in headers.items()}
-            logger.info(f"[DEBUG] Request headers: {redacted_headers}")
-            payload = {
-                "model": self.model,
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.3
-            }
-            logger.info(f"[DEBUG] Request payload: {json.dumps(payload)}")
-            logger.debug(f"Sending request to OpenRouter API (model: {self.model})")
             try:
-                response = await self.client.post(
-                    self.api_url,
-                    headers=headers,
-                    json=payload,
-                    timeout=60.0
-                )
-                response_time = time.time() - start_time
-                logger.debug(f"OpenRouter API response status: {response.status_code}")
-                logger.info(f"[DEBUG] Response status: {response.status_code}")
-                logger.info(f"[DEBUG] Response headers: {dict(response.headers)}")
-                logger.info(f"[DEBUG] Response text: {response.text}")
-                response.raise_for_status()
-                
-                # Get the raw response text first for debugging
-                response_text = response.text
-                logger.info(f"[DEBUG] Raw API response: {response_text}")
-                logger.info(f"[DEBUG] Response headers: {dict(response.headers)}")
+                # Parse the raw bytes directly, skipping a str decode of the body
+                result = orjson.loads(response.content)
+                logger.debug("Successfully parsed JSON response")
                 
-                try:
-                    result = response.json()
-                    logger.debug("Successfully parsed JSON response")
-                    
-                    # Log API usage if available
-                    if 'usage' in result:
-                        usage = result['usage']
-                        logger.debug(
-                            f"API usage - Prompt tokens: {usage.get('prompt_tokens', 'N/A')}, "
-                            f"Completion tokens: {usage.get('completion_tokens', 'N/A')}, "
-                            f"Total tokens: {usage.get('total_tokens', 'N/A')}"
-                        )
-                    
-                    # Extract content from the response
-                    content = result.get('choices', [{}])[0].get('message', {}).get('content')
-                    if not content:
-                        error_msg = "No content in API response"
-                        logger.error(f"{error_msg}. Full response: {result}")
-                        raise ValueError(error_msg)
-                    
-                    logger.debug(f"Raw API response content: {content}")
-                    
-                    try:
-                        analysis = json.loads(content)
-                        logger.debug("Successfully parsed content as JSON")
-                        
-                        result = {
-                            "clause": clause,
-                            "risk_score": float(analysis.get("risk_score", 0)),
-                            "explanation": analysis.get("explanation", ""),
-                            "clause_type": analysis.get("clause_type", "Other"),
-                            "safer_version": analysis.get("safer_version", clause)
-                        }
-                        
-                        logger.debug(f"Analysis complete. Risk score: {result['risk_score']}, Type: {result['clause_type']}")
-                        return result
-                    
-                    except json.JSONDecodeError as e:
-                        error_msg = f"Failed to parse API response as JSON: {str(e)}"
-                        logger.error(f"{error_msg}. Raw response: {response_text}")
-                        logger.error(f"Response headers: {dict(response.headers)}")
-                        raise ValueError(f"{error_msg}. Raw response: {response_text}") from e
-                        
-                except Exception as e:
-                    error_msg = f"Failed to extract analysis from API response: {str(e)}"
-                    logger.error(f"{error_msg}. Raw response: {response_text}")
-                    logger.error(f"Response headers: {dict(response.headers)}")
-                    if 'content' in locals():
-                        logger.error(f"Response content: {content}")
-                    raise ValueError(f"{error_msg}. Raw response: {response_text}") from e
-                    
-            except httpx.HTTPStatusError as e:
-                error_msg = f"OpenRouter API request failed with status {e.response.status_code}"
-                logger.error(error_msg)
-                logger.error(f"Response: {e.response.text}")
-                raise
+                # Log API usage if available
+                if 'usage' in result and logger.isEnabledFor(logging.DEBUG):
+                    usage = result['usage']
+                    logger.debug(
+                        "API usage - Prompt tokens: %s, Completion tokens: %s, Total tokens: %s",
+                        usage.get('prompt_tokens', 'N/A'),
+                        usage.get('completion_tokens', 'N/A'),
+                        usage.get('total_tokens', 'N/A')
+                    )
                 
-            except httpx.TimeoutException:
-                error_msg = "OpenRouter API request timed out"
-                logger.error(error_msg)
-                raise TimeoutError(error_msg) from None
+                # Extract content from the response
+                content = result.get('choices', [{}])[0].get('message', {}).get('content')
+                if not content:
+                    error_msg = "No content in API response"
+                    logger.error(f"{error_msg}. Full response: {result}")
+                    raise ValueError(error_msg)
                 
-            except Exception as e:
-                error_msg = f"Unexpected error calling OpenRouter API: {str(e)}"
-                logger.error(error_msg)
-                logger.error(traceback.format_exc())
-                raise
+                logger.debug("Raw API response content: %s", content)
+                return content
                     
+            except Exception as e:
+                # Only decode the body as text when reporting a failure
+                response_text = response.text
+                error_msg = f"Failed to extract analysis from API response: {str(e)}"
+                logger.error(f"{error_msg}. Raw response: {response_text}")
+                logger.error(f"Response headers: {dict(response.headers)}")
+                raise ValueError(f"{error_msg}. Raw response: {response_text}") from e
+                
+        except httpx.HTTPStatusError as e:
+            error_msg = f"OpenRouter API request failed with status {e.response.status_code}"
+            logger.error(error_msg)
+            logger.error(f"Response: {e.response.text}")
+            raise
+            
+        except httpx.TimeoutException:
+            error_msg = "OpenRouter API request timed out"
+            logger.error(error_msg)
+            raise TimeoutError(error_msg) from None
+            
         except Exception as e:
-            logger.error(f"Error in analyze_clause: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("Unexpected error calling OpenRouter API: %s", e)
+            raise
+    
+    async def _post_with_retry(self, payload: Dict[str, Any]) -> httpx.Response:
+        """
+        POST the payload, retrying rate limits, transient errors and timeouts.
+        
+        Uses exponential backoff with jitter, capped at 30 seconds per wait.
+        
+        Args:
+            payload: JSON body for the chat completions request
             
-            # Return error response
-            return {
-                "clause": clause,
-                "risk_score": 0.0,
-                "explanation": f"Error analyzing clause: {str(e)}",
-                "clause_type": "Error",
-                "safer_version": clause,
-                "error": str(e)
-            }
+        Returns:
+            The successful httpx response
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Serialize once with orjson; Content-Type is already set in self.headers
+                response = await self.client.post(
+                    self.api_url, headers=self.headers, content=orjson.dumps(payload)
+                )
+                response.raise_for_status()
+                return response
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                    raise
+                reason = f"status {e.response.status_code}"
+            except httpx.TimeoutException:
+                if attempt == self.max_retries:
+                    raise
+                reason = "timeout"
+            
+            delay = min(2 ** attempt + random.random(), 30)
+            logger.warning(
+                f"OpenRouter request failed ({reason}), retrying in {delay:.1f}s "
+                f"(attempt {attempt + 1}/{self.max_retries})"
+            )
+            await asyncio.sleep(delay)
+    
+    async def analyze_clauses(self, clauses: List[str]) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Analyze clauses in batched requests, several batches at a time.
+        
+        Boilerplate and cached clauses are answered directly; the rest are sent in batches of
+        up to ``batch_size`` clauses per request. A batch whose response cannot
+        be parsed falls back to analyzing its clauses individually; a batch whose
+        request failed records that exception for each of its clauses.
+        
+        Args:
+            clauses: The clause texts to analyze
+            
+        Returns:
+            List of analysis dicts (or exceptions) in the same order as clauses
+        """
+        results: List[Union[Dict[str, Any], Exception, None]] = [None] * len(clauses)
+        candidates = []
+        for i, clause in enumerate(clauses):
+            if self._is_boilerplate(clause):
+                results[i] = self._boilerplate_result(clause)
+            else:
+                candidates.append(i)
+        
+        pending = []
+        cached_results = await self._cache.get_many([clauses[i] for i in candidates])
+        for i, cached in zip(candidates, cached_results):
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append(i)
+        
+        batches = [pending[k:k + self.batch_size] for k in range(0, len(pending), self.batch_size)]
+        logger.debug(
+            "Analyzing %d clauses in %d batches (%d prefiltered or cached, max concurrency: %d)",
+            len(pending), len(batches), len(clauses) - len(pending), self.max_concurrency
+        )
+        semaphore = self._semaphore
+        
+        async def analyze_one(clause: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.analyze_clause(clause)
+        
+        async def analyze_batch(indices: List[int]) -> None:
+            batch = [clauses[i] for i in indices]
+            analyses = None
+            if len(batch) > 1:
+                async with semaphore:
+                    try:
+                        analyses = await self._analyze_batch(batch)
+                    except ValueError as e:
+                        # Unparseable reply: single-clause prompts may still succeed
+                        logger.warning(
+                            "Batch analysis of %d clauses failed (%s), falling back to per-clause analysis",
+                            len(batch), e
+                        )
+                    except Exception as e:
+                        # Retries are already exhausted (rate limit, server error, timeout);
+                        # fanning out would only multiply requests to a failing provider
+                        logger.error("Batch analysis of %d clauses failed: %s", len(batch), e)
+                        analyses = [e] * len(batch)
+            if analyses is None:
+                analyses = await asyncio.gather(
+                    *(analyze_one(clause) for clause in batch),
+                    return_exceptions=True
+                )
+            for i, analysis in zip(indices, analyses):
+                results[i] = analysis
+        
+        await asyncio.gather(*(analyze_batch(indices) for indices in batches))
+        return results
+    
+    def _is_boilerplate(self, clause: str) -> bool:
+        """Return True for short clauses without any risk keyword."""
+        return (
+            self.prefilter
+            and len(clause) < PREFILTER_MAX_LENGTH
+            and INTERESTING_RE.search(clause) is None
+        )
+    
+    def _boilerplate_result(self, clause: str) -> Dict[str, Any]:
+        """Build the default low-risk analysis for a prefiltered clause."""
+        return {
+            "clause": clause,
+            "risk_score": 0.0,
+            "explanation": "No risk indicators detected",
+            "clause_type": "Boilerplate",
+            "safer_version": clause
+        }
+    
+    async def _analyze_batch(self, clauses: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze several clauses with a single API request.
+        
+        Args:
+            clauses: The clause texts to analyze
+            
+        Returns:
+            List of analysis dicts in the same order as clauses
+            
+        Raises:
+            ValueError: If the response does not hold an analysis for every clause
+        """
+        prompt = self._build_batch_prompt(clauses)
+        content = await self._complete(prompt, self.max_tokens * len(clauses), _BATCH_RESPONSE_FORMAT)
+        
+        items = orjson.loads(content)
+        if isinstance(items, dict):
+            items = items.get("analyses")
+        if not isinstance(items, list):
+            raise ValueError("Batch response does not contain a JSON array of analyses")
+        by_index = {
+            int(item["i"]): item for item in items
+            if isinstance(item, dict) and "i" in item
+        }
+        if set(by_index) != set(range(len(clauses))):
+            raise ValueError(
+                f"Batch response covers {len(by_index)} of {len(clauses)} clauses"
+            )
+        
+        results = [self._build_result(clause, by_index[i]) for i, clause in enumerate(clauses)]
+        await self._cache.set_many(list(zip(clauses, results)))
+        return results
     
     def _build_prompt(self, clause: str) -> str:
         """
@@ -205,21 +487,17 @@ class OpenRouterAnalyzer(BaseClauseAnalyzer):
         Returns:
             Formatted prompt string
         """
-        logger.debug("Building prompt for OpenRouter API")
+        return self._PROMPT_HEAD + clause + self._PROMPT_TAIL
+    
+    def _build_batch_prompt(self, clauses: List[str]) -> str:
+        """
+        Build a prompt asking for the analysis of several numbered clauses.
         
-        prompt = f"""You are a legal document analysis assistant. Analyze the following legal clause and provide:
-
-1. Risk score (0-5, where 0 is no risk and 5 is high risk)
-2. Brief explanation of the risk
-3. Clause type (e.g., 'Liability', 'Confidentiality', 'Termination', 'Governing Law', 'Indemnification')
-4. A safer rewritten version of the clause
-
-IMPORTANT: Return ONLY a valid JSON object with these exact keys: risk_score, explanation, clause_type, safer_version
-
-Clause to analyze:
-{clause}
-
-JSON Response:"""
-
-        logger.debug(f"Built prompt with {len(clause)} characters of clause text")
-        return prompt
+        Args:
+            clauses: The legal clauses to analyze
+            
+        Returns:
+            Formatted prompt string
+        """
+        numbered = "\n\n".join(f"[{i}] {clause}" for i, clause in enumerate(clauses))
+        return self._BATCH_PROMPT_HEAD + numbered + self._PROMPT_TAIL
@@ -1,112 +1,327 @@
+import asyncio
+import io
 import logging
 import os
-import tempfile
-import traceback
-from typing import List, Dict, Any, Optional
+import re
+from concurrent.futures import Executor
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional, Tuple, Union
 
 import spacy
+from spacy.language import Language
 
-from .text_extractor import TextExtractorFactory
+from app.models.schemas import ClauseAnalysisBase, DocumentAnalysis
+from .text_extractor import TextExtractor, TextExtractorFactory
 from .analyzers.base_analyzer import BaseClauseAnalyzer
 
 logger = logging.getLogger(__name__)
 
+# Clause boundary: whitespace after terminal punctuation, before an uppercase letter, quote or parenthesis
+_SENT_RE = re.compile(r'(?<=[.!?;])\s+(?=[A-Z"\(])')
+
+# Characters that end a clause; clauses ending otherwise may continue on the next page
+SENTENCE_ENDINGS = ('.', '!', '?', ';', ':')
+
+# Clause type of the placeholder recorded for a clause whose analysis failed
+ERROR_CLAUSE_TYPE = "Error"
+
+# Client-visible explanation of a failed clause; the cause is only logged
+ERROR_EXPLANATION = "This clause could not be analyzed. Please try again later."
+
+# Bounded queues between the extraction, splitting and analysis stages
+PAGE_QUEUE_SIZE = 4
+CLAUSE_QUEUE_SIZE = 32
+
+# Concurrent analysis workers; the analyzer still bounds in-flight API requests
+ANALYSIS_WORKERS = 4
+
+class AnalysisUnavailableError(RuntimeError):
+    """Raised when no clause of a document could be analyzed, e.g. while the API is down."""
+
+def build_sentence_pipeline() -> Language:
+    """Build a blank English spaCy pipeline that only splits sentences.
+    
+    Clause splitting only needs sentence boundaries, so the rule-based
+    sentencizer replaces a full trained model (tagger, parser, NER).
+    """
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+def extract_pages(ext: str, source: Union[str, bytes]) -> List[str]:
+    """Extract all page texts of a document.
+    
+    Module-level so it can run in a worker process.
+    
+    Args:
+        ext: File extension including the dot (e.g. '.pdf').
+        source: File path or raw file contents.
+    """
+    extractor = TextExtractorFactory.get_extractor_for_extension(ext)
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return list(extractor.iter_pages(source))
+
 class DocumentProcessor:
     """Process documents and analyze their clauses."""
     
-    def __init__(self, clause_analyzer: BaseClauseAnalyzer):
-        """Initialize with a clause analyzer."""
+    def __init__(self, clause_analyzer: BaseClauseAnalyzer, nlp: Optional[Language] = None,
+                 executor: Optional[Executor] = None):
+        """Initialize with a clause analyzer.
+        
+        Clauses are split with a compiled regular expression unless a spaCy
+        pipeline is supplied, in which case its sentence segmentation is used.
+        Text is extracted page by page in a worker thread, or in one call on
+        the given executor (e.g. a process pool) when supplied.
+        """
         logger.info("Initializing DocumentProcessor")
         self.clause_analyzer = clause_analyzer
-        
-        try:
-            logger.debug("Loading spaCy model...")
-            self.nlp = spacy.load("en_core_web_sm")
-            logger.info("spaCy model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load spaCy model: {str(e)}")
-            logger.error(traceback.format_exc())
-            raise
+        self.nlp = nlp
+        self.executor = executor
+        logger.info(f"Clause splitter: {'spaCy' if nlp is not None else 'regex'}")
     
-    async def process_document(self, file_path: str) -> Dict[str, Any]:
+    async def process_document(self, file_path: str) -> DocumentAnalysis:
         """Process a document and return the analysis."""
         logger.info(f"Processing document: {file_path}")
         
-        try:
-            # Extract text
-            logger.debug("Extracting text from document...")
-            text = self._extract_text(file_path)
-            if not text:
-                error_msg = "Failed to extract text from the document"
-                logger.error(error_msg)
-                raise ValueError(error_msg)
-            
-            logger.debug(f"Extracted text length: {len(text)} characters")
-            
-            # Preprocess and split into clauses
-            logger.debug("Preprocessing text and splitting into clauses...")
-            text = self._preprocess_text(text)
-            clauses = self._split_into_clauses(text)
-            logger.info(f"Document split into {len(clauses)} clauses")
-            
-            # Analyze each clause
-            analyses = []
-            logger.debug("Starting clause analysis...")
+        # Extract text page by page
+        logger.debug("Extracting text from document...")
+        pages = await self._extract_pages(os.path.splitext(file_path)[1], file_path)
+        result = await self._analyze_pages(pages)
+        logger.info("Document processing completed successfully")
+        return result
             
-            for i, clause in enumerate(clauses, 1):
-                try:
-                    if len(clause) > 20:  # Only analyze meaningful clauses
-                        logger.debug(f"Analyzing clause {i}/{len(clauses)} (length: {len(clause)})")
-                        analysis = await self.clause_analyzer.analyze_clause(clause)
-                        analyses.append(analysis)
-                        logger.debug(f"Clause {i} analysis complete")
-                    else:
-                        logger.debug(f"Skipping short clause: {clause[:50]}...")
-                except Exception as e:
-                    logger.error(f"Error analyzing clause {i}: {str(e)}")
-                    logger.error(f"Clause content: {clause}")
-                    logger.error(traceback.format_exc())
-                    # Continue with other clauses even if one fails
+    async def process_document_bytes(self, data: bytes, ext: str) -> DocumentAnalysis:
+        """Process an in-memory document and return the analysis.
             
-            logger.info(f"Completed analysis of {len(analyses)} clauses")
-            
-            # Calculate overall risk (simple average for now)
-            overall_risk = 0.0
+        Args:
+            data: Raw file contents.
+            ext: File extension including the dot (e.g. '.pdf').
+        """
+        logger.info(f"Processing in-memory {ext} document ({len(data)} bytes)")
+        
+        logger.debug("Extracting text from document bytes...")
+        pages = await self._extract_pages(ext, data)
+        result = await self._analyze_pages(pages)
+        logger.info("Document processing completed successfully")
+        return result
+    
+    async def stream_document_bytes(self, data: bytes, ext: str) -> AsyncIterator[Dict[str, Any]]:
+        """Analyze an in-memory document, yielding clause analyses as they complete.
+        
+        Clauses are yielded in completion order rather than document order;
+        each carries a ``position`` of ``[chunk, offset]`` that sorts into
+        document order. The last item is ``{"overall_risk": ...}`` for the
+        whole document.
+        
+        Args:
+            data: Raw file contents.
+            ext: File extension including the dot (e.g. '.pdf').
+        """
+        logger.info(f"Streaming analysis of in-memory {ext} document ({len(data)} bytes)")
+        
+        pages = await self._extract_pages(ext, data)
+        analyses = []
+        async for index, meaningful, chunk_results in self._iter_chunks(pages, {"clauses": 0}):
+            for offset, analysis in enumerate(self._collect(meaningful, chunk_results)):
+                analyses.append(analysis)
+                # Copy, since the analysis dict may be shared with the clause cache
+                yield {**analysis, "position": [index, offset]}
+        
+        yield {"overall_risk": self._overall_risk(analyses)}
+    
+    async def _analyze_pages(self, pages: AsyncIterator[str]) -> DocumentAnalysis:
+        """Analyze all pages and assemble the clauses in document order."""
+        results: Dict[int, Tuple[List[str], List[Any]]] = {}
+        counts = {"clauses": 0}
+        async for index, meaningful, chunk_results in self._iter_chunks(pages, counts):
+            results[index] = (meaningful, chunk_results)
+        
+        clause_count = counts["clauses"]
+        logger.info(f"Document split into {clause_count} clauses")
+        
+        analyses = []
+        analyzed_count = 0
+        for index in sorted(results):
+            meaningful, chunk_results = results[index]
+            analyzed_count += len(meaningful)
+            analyses.extend(self._collect(meaningful, chunk_results))
+        
+        failed_count = sum(1 for a in analyses if a['clause_type'] == ERROR_CLAUSE_TYPE)
+        logger.info(f"Completed analysis of {len(analyses) - failed_count} clauses "
+                    f"({failed_count} failed, "
+                    f"skipped {clause_count - analyzed_count} short clauses)")
+        
+        overall_risk = self._overall_risk(analyses)
+        
+        # Clause fields were validated by the analyzer, so skip re-validation here
+        return DocumentAnalysis.model_construct(
+            clauses=[ClauseAnalysisBase.model_construct(**a) for a in analyses],
+            overall_risk=overall_risk
+        )
+    
+    async def _iter_chunks(self, pages: AsyncIterator[str],
+                           counts: Dict[str, int]) -> AsyncIterator[Tuple[int, List[str], List[Any]]]:
+        """Run the extraction, splitting and analysis stages and yield analyzed chunks.
+        
+        Pages are extracted off the event loop, split into clauses and handed
+        to analysis workers through bounded queues, so extraction, splitting
+        and API latency overlap instead of adding up. Chunks are yielded as
+        ``(index, clauses, results)`` in completion order.
+        
+        Raises:
+            ValueError: If the document contains no clauses
+        """
+        page_q: asyncio.Queue = asyncio.Queue(maxsize=PAGE_QUEUE_SIZE)
+        clause_q: asyncio.Queue = asyncio.Queue(maxsize=CLAUSE_QUEUE_SIZE)
+        result_q: asyncio.Queue = asyncio.Queue()
+        
+        workers = [
+            asyncio.create_task(self._extract_stage(pages, page_q)),
+            asyncio.create_task(self._split_stage(page_q, clause_q, counts)),
+            *[asyncio.create_task(self._analysis_stage(clause_q, result_q))
+              for _ in range(ANALYSIS_WORKERS)],
+        ]
+        pipeline = asyncio.gather(*workers)
+        # Wake the consumer once every stage has finished or one has failed
+        pipeline.add_done_callback(lambda _: result_q.put_nowait(None))
+        
+        try:
+            while (chunk := await result_q.get()) is not None:
+                yield chunk
+            await pipeline
+        finally:
+            # Stop the stages and wait for them to clean up, e.g. to close the document
+            pipeline.cancel()
+            await asyncio.gather(pipeline, return_exceptions=True)
+        
+        if counts["clauses"] == 0:
+            error_msg = "Failed to extract text from the document"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+    
+    def _collect(self, clauses: List[str], results: List[Any]) -> List[Dict[str, Any]]:
+        """Return the analyses of a chunk, recording failed clauses as error markers."""
+        analyses = []
+        for clause, analysis in zip(clauses, results):
+            if isinstance(analysis, Exception):
+                logger.error(f"Error analyzing clause: {str(analysis)}")
+                logger.error(f"Clause content: {clause}")
+                # Keep the clause visible to the user, but out of the risk average
+                analysis = {
+                    "clause": clause,
+                    "risk_score": 0.0,
+                    "explanation": ERROR_EXPLANATION,
+                    "clause_type": ERROR_CLAUSE_TYPE,
+                    "safer_version": clause
+                }
+            analyses.append(analysis)
+        return analyses
+    
+    def _overall_risk(self, analyses: List[Dict[str, Any]]) -> float:
+        """Calculate the overall document risk as the average over analyzed clauses.
+        
+        Clauses whose analysis failed are excluded, so API errors do not pull
+        the score down.
+        
+        Raises:
+            AnalysisUnavailableError: If every clause failed, since a score of 0.0
+                would present the document as risk-free
+        """
+        scores = [a['risk_score'] for a in analyses if a['clause_type'] != ERROR_CLAUSE_TYPE]
+        if not scores:
             if analyses:
-                overall_risk = sum(a['risk_score'] for a in analyses) / len(analyses)
-                logger.debug(f"Calculated overall risk: {overall_risk}")
-            
-            result = {
-                "clauses": analyses,
-                "overall_risk": overall_risk
-            }
+                raise AnalysisUnavailableError(f"All {len(analyses)} clause analyses failed")
+            return 0.0
+        overall_risk = sum(scores) / len(scores)
+        logger.debug(f"Calculated overall risk: {overall_risk}")
+        return overall_risk
+    
+    async def _extract_stage(self, pages: AsyncIterator[str], page_q: asyncio.Queue) -> None:
+        """Pull pages from the extractor and queue them."""
+        async for page in pages:
+            await page_q.put(page)
+        await page_q.put(None)
+    
+    async def _split_stage(self, page_q: asyncio.Queue, clause_q: asyncio.Queue,
+                           counts: Dict[str, int]) -> None:
+        """Split queued pages into clauses and queue the meaningful ones for analysis."""
+        index = 0
+        page_number = 0
+        carry = ""
+        
+        while True:
+            page = await page_q.get()
+            if page is None:
+                # Flush the clause held back from the last page
+                clauses = [carry] if carry else []
+            else:
+                page_number += 1
+                logger.debug(f"Extracted page {page_number} ({len(page)} characters)")
+                text = self._preprocess_text(f"{carry} {page}")
+                clauses = self._split_into_clauses(text)
+                
+                # A sentence may continue on the next page; hold back an unterminated last clause
+                carry = clauses.pop() if clauses and not clauses[-1].endswith(SENTENCE_ENDINGS) else ""
             
-            logger.info("Document processing completed successfully")
-            return result
+            counts["clauses"] += len(clauses)
+            meaningful = [clause for clause in clauses if len(clause) > 20]
+            if meaningful:
+                await clause_q.put((index, meaningful))
+                index += 1
             
-        except Exception as e:
-            logger.error(f"Error processing document: {str(e)}")
-            logger.error(traceback.format_exc())
-            raise
+            if page is None:
+                break
+        
+        for _ in range(ANALYSIS_WORKERS):
+            await clause_q.put(None)
     
-    def _extract_text(self, file_path: str) -> str:
-        """Extract text from a file."""
-        logger.debug(f"Extracting text from file: {file_path}")
+    async def _analysis_stage(self, clause_q: asyncio.Queue, result_q: asyncio.Queue) -> None:
+        """Analyze queued clause chunks until the splitter signals the end."""
+        while (item := await clause_q.get()) is not None:
+            index, meaningful = item
+            await result_q.put((index, meaningful, await self.clause_analyzer.analyze_clauses(meaningful)))
+    
+    async def _extract_pages(self, ext: str, source: Union[str, bytes]) -> AsyncIterator[str]:
+        """Return an async iterator over the pages of a document path or contents."""
+        extractor = self._get_extractor(ext)
+        if self.executor is None:
+            # Pages are pulled lazily, on the thread the extractor requires
+            pages = extractor.iter_pages(io.BytesIO(source) if isinstance(source, bytes) else source)
+            return self._pull_pages(pages, extractor.executor)
+        
+        loop = asyncio.get_running_loop()
+        return self._pull_pages(iter(await loop.run_in_executor(self.executor, extract_pages, ext, source)))
+    
+    @staticmethod
+    async def _pull_pages(pages: Iterator[str], executor: Optional[Executor] = None) -> AsyncIterator[str]:
+        """Pull pages from a blocking iterator on an executor thread (default pool if None)."""
+        loop = asyncio.get_running_loop()
+        pull = None
         try:
-            extractor = TextExtractorFactory.get_extractor(file_path)
-            if not extractor:
-                error_msg = f"Unsupported file type: {file_path}"
-                logger.error(error_msg)
-                raise ValueError(error_msg)
-                
-            text = extractor.extract_text(file_path)
-            logger.debug(f"Successfully extracted {len(text)} characters")
-            return text
-            
-        except Exception as e:
-            logger.error(f"Error extracting text from {file_path}: {str(e)}")
-            logger.error(traceback.format_exc())
-            raise
+            while True:
+                pull = loop.run_in_executor(executor, next, pages, None)
+                # Shielded, so cancelling the consumer leaves the pull to finish on its thread
+                page = await asyncio.shield(pull)
+                if page is None:
+                    break
+                yield page
+        finally:
+            # A generator cannot be closed while another thread is still running it
+            if pull is not None and not pull.done():
+                await asyncio.gather(pull, return_exceptions=True)
+            # Release the open document on the same thread if extraction stopped early
+            close = getattr(pages, "close", None)
+            if close is not None:
+                await loop.run_in_executor(executor, close)
+    
+    def _get_extractor(self, ext: str) -> TextExtractor:
+        """Return the text extractor for a file extension."""
+        extractor = TextExtractorFactory.get_extractor_for_extension(ext)
+        if not extractor:
+            error_msg = f"Unsupported file type: {ext}"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        return extractor
     
     def _preprocess_text(self, text: str) -> str:
         """Clean and preprocess the extracted text."""
@@ -116,21 +331,24 @@ class DocumentProcessor:
             logger.debug(f"Text preprocessed. Original length: {len(text)}, Processed length: {len(processed)}")
             return processed
         except Exception as e:
-            logger.error(f"Error preprocessing text: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("Error preprocessing text: %s", e)
             # Return original text if preprocessing fails
             return text
     
     def _split_into_clauses(self, text: str) -> List[str]:
-        """Split text into clauses using spaCy sentence segmentation."""
+        """Split text into clauses using the regex splitter or spaCy sentence segmentation."""
         logger.debug("Splitting text into clauses...")
+        if self.nlp is None:
+            clauses = [s.strip() for s in _SENT_RE.split(text) if s.strip()]
+            logger.debug(f"Text split into {len(clauses)} clauses")
+            return clauses
+        
         try:
             doc = self.nlp(text)
             clauses = [sent.text.strip() for sent in doc.sents if sent.text.strip()]
             logger.debug(f"Text split into {len(clauses)} clauses")
             return clauses
         except Exception as e:
-            logger.error(f"Error splitting text into clauses: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("Error splitting text into clauses: %s", e)
             # Fallback to simple split on periods if spaCy fails
             return [s.strip() for s in text.split('.') if s.strip()]
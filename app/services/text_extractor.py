@@ -1,48 +1,105 @@
+import logging
 from abc import ABC, abstractmethod
-from typing import Optional
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterator, Optional, Union
 import pdfplumber
 from docx import Document
-import tempfile
 import os
 
+from app.core.config import get_settings
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # pragma: no cover - optional dependency
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+# PyMuPDF does not support multithreading, so all in-process MuPDF work runs on this one thread
+_MUPDF_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mupdf")
+
 class TextExtractor(ABC):
     """Abstract base class for text extractors."""
     
+    # Thread pool that pages must be pulled on; None means any worker thread
+    executor: Optional[Executor] = None
+    
     @abstractmethod
-    def extract_text(self, file_path: str) -> str:
-        """Extract text from the given file."""
+    def extract_text(self, source: Union[str, BinaryIO]) -> str:
+        """Extract text from the given file path or binary file object."""
         pass
 
+    def iter_pages(self, source: Union[str, BinaryIO]) -> Iterator[str]:
+        """Yield the text of the document page by page.
+        
+        Formats without pages yield the whole text as a single chunk.
+        """
+        yield self.extract_text(source)
+
 class PDFTextExtractor(TextExtractor):
     """Extract text from PDF files."""
     
-    def extract_text(self, file_path: str) -> str:
+    def extract_text(self, source: Union[str, BinaryIO]) -> str:
         """Extract text from a PDF file."""
-        text = ""
-        with pdfplumber.open(file_path) as pdf:
+        return "\n".join(self.iter_pages(source))
+    
+    def iter_pages(self, source: Union[str, BinaryIO]) -> Iterator[str]:
+        """Yield the text of each PDF page as it is extracted."""
+        with pdfplumber.open(source) as pdf:
             for page in pdf.pages:
-                text += page.extract_text() or ""
-        return text
+                yield page.extract_text() or ""
+
+class PyMuPDFTextExtractor(PDFTextExtractor):
+    """Extract text from PDF files with PyMuPDF's C backend."""
+    
+    executor = _MUPDF_EXECUTOR
+    
+    def iter_pages(self, source: Union[str, BinaryIO]) -> Iterator[str]:
+        """Yield the text of each PDF page as it is extracted."""
+        if isinstance(source, str):
+            doc = fitz.open(source)
+        else:
+            doc = fitz.open(stream=source.read(), filetype="pdf")
+        with doc:
+            for page in doc:
+                yield page.get_text("text")
 
 class DOCXTextExtractor(TextExtractor):
     """Extract text from DOCX files."""
     
-    def extract_text(self, file_path: str) -> str:
+    def extract_text(self, source: Union[str, BinaryIO]) -> str:
         """Extract text from a DOCX file."""
-        doc = Document(file_path)
+        doc = Document(source)
         return "\n".join([para.text for para in doc.paragraphs if para.text])
 
+# Shared extractor instances keyed by lowercased extension. The '.pdf' entry is
+# added on first use because its backend comes from the settings.
+_EXTRACTORS: Dict[str, TextExtractor] = {
+    '.docx': DOCXTextExtractor(),
+}
+
 class TextExtractorFactory:
     """Factory class to create appropriate text extractor based on file extension."""
     
     @staticmethod
     def get_extractor(file_path: str) -> Optional[TextExtractor]:
         """Get the appropriate text extractor for the given file."""
-        _, ext = os.path.splitext(file_path.lower())
+        return TextExtractorFactory.get_extractor_for_extension(os.path.splitext(file_path)[1])
         
-        extractors = {
-            '.pdf': PDFTextExtractor(),
-            '.docx': DOCXTextExtractor(),
-        }
-        
-        return extractors.get(ext)
+    @staticmethod
+    def get_extractor_for_extension(ext: str) -> Optional[TextExtractor]:
+        """Get the appropriate text extractor for a file extension such as '.pdf'."""
+        ext = ext.lower()
+        if ext == '.pdf' and ext not in _EXTRACTORS:
+            _EXTRACTORS[ext] = TextExtractorFactory._pdf_extractor()
+        return _EXTRACTORS.get(ext)
+    
+    @staticmethod
+    def _pdf_extractor() -> TextExtractor:
+        """Return a PDF extractor for the configured backend."""
+        if get_settings().PDF_BACKEND.lower() == "pdfplumber":
+            return PDFTextExtractor()
+        if fitz is None:
+            logger.warning("PyMuPDF is not installed; falling back to pdfplumber")
+            return PDFTextExtractor()
+        return PyMuPDFTextExtractor()
@@ -1,13 +1,13 @@
 import streamlit as st
-import os
-import time
+import hashlib
+import numpy as np
 import pandas as pd
 import plotly.express as px
 from pathlib import Path
 from typing import Dict, Any, Optional
 
 # Import utilities
-from utils import analyze_document, get_health, save_uploaded_file
+from utils import analyze_document_bytes_stream, get_health
 
 # Page configuration
 st.set_page_config(
@@ -38,11 +38,19 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+@st.cache_data(ttl=10, show_spinner=False)
+def cached_health() -> bool:
+    """Backend health status, polled at most every 10 seconds across reruns."""
+    return get_health()
+
 # Initialize session state
 if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = None
 if 'uploaded_file' not in st.session_state:
     st.session_state.uploaded_file = None
+if 'analysis_cache' not in st.session_state:
+    # Analysis results keyed by a hash of the uploaded file contents
+    st.session_state.analysis_cache = {}
 
 def display_sidebar():
     """Display the sidebar with app information and controls."""
@@ -51,7 +59,7 @@ def display_sidebar():
     
     # API status
     st.sidebar.subheader("API Status")
-    api_status = get_health()
+    api_status = cached_health()
     status_text = "🟢 Running" if api_status else "🔴 Not Available"
     st.sidebar.markdown(f"**Backend API:** {status_text}")
     
@@ -110,45 +118,63 @@ def process_uploaded_file():
     
     # Analyze button
     if st.button("🔍 Analyze Document", use_container_width=True):
+        file_hash = hashlib.blake2b(uploaded_file.getbuffer(), digest_size=16).hexdigest()
+        cached = st.session_state.analysis_cache.get(file_hash)
+        if cached:
+            # Same document analyzed earlier in this session; skip the upload
+            st.session_state.analysis_results = cached
+            st.session_state.show_results = True
+            st.rerun()
+        
         with st.spinner("Analyzing document..."):
-            # Save the uploaded file
-            file_path = save_uploaded_file(uploaded_file)
+            # Send the upload straight from memory and show clauses as they stream back
+            analysis_results = stream_analysis(uploaded_file.name, uploaded_file.getvalue())
             
-            if file_path:
-                # Show progress bar
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                # Simulate progress
-                for percent in range(0, 101, 10):
-                    time.sleep(0.1)
-                    progress_bar.progress(percent)
-                    status_text.text(f"Progress: {percent}%")
-                
-                # Get analysis results
-                analysis_results = analyze_document(file_path)
-                
-                if analysis_results:
-                    st.session_state.analysis_results = analysis_results
-                    st.session_state.show_results = True
-                    st.rerun()
-                else:
-                    st.error("Failed to analyze the document. Please try again.")
-                    st.session_state.analysis_results = None
-                    st.session_state.show_results = False
-                
-                # Clean up the temporary file
-                try:
-                    os.remove(file_path)
-                except:
-                    pass
+            if analysis_results:
+                st.session_state.analysis_cache[file_hash] = analysis_results
+                st.session_state.analysis_results = analysis_results
+                st.session_state.show_results = True
+                st.rerun()
             else:
-                st.error("Failed to save the uploaded file.")
+                st.error("Failed to analyze the document. Please try again.")
+                st.session_state.analysis_results = None
+                st.session_state.show_results = False
     
     # Display results if available
     if st.session_state.get('show_results', False) and st.session_state.analysis_results:
         display_analysis_results(st.session_state.analysis_results)
 
+def stream_analysis(name: str, blob: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Stream the analysis of a document, showing progress per clause.
+    
+    Args:
+        name: File name of the upload
+        blob: Raw file contents
+    
+    Returns:
+        Analysis results with 'overall_risk' and 'clauses' keys, or None on error
+    """
+    status = st.empty()
+    clauses = []
+    
+    for item in analyze_document_bytes_stream(name, blob):
+        if "detail" in item:
+            st.error(f"Analysis failed: {item['detail']}")
+            return None
+        if "overall_risk" in item:
+            status.empty()
+            # Clauses arrive in completion order; restore document order for the results
+            clauses.sort(key=lambda clause: clause["position"])
+            return {"overall_risk": item["overall_risk"], "clauses": clauses}
+        
+        clauses.append(item)
+        status.info(f"Analyzed {len(clauses)} clauses...")
+        st.write(f"**{item['clause_type']}** ({item['risk_score']:.1f}/5.0): {item['clause'][:100]}")
+    
+    # The stream ended without a summary line
+    return None
+
 def display_analysis_results(results: Dict[str, Any]):
     """Display the analysis results."""
     st.markdown("---")
@@ -238,28 +264,36 @@ def display_detailed_view(clauses: list):
         st.markdown("---")
 
 
+@st.cache_data(show_spinner=False)
+def risk_distribution_chart(scores: tuple):
+    """Pie chart of risk score counts, cached for unchanged analyses."""
+    counts = pd.Series(scores).value_counts(sort=False)
+    return px.pie(
+        values=counts.to_numpy(),
+        names=counts.index,
+        title='Risk Score Distribution',
+        color_discrete_sequence=px.colors.sequential.RdBu_r
+    )
+
 def display_summary_view(clauses: list):
     """Display summary statistics and visualizations."""
     if not clauses:
         return
     
-    # Create DataFrame for visualization
-    df = pd.DataFrame([{
-        'Clause': f"Clause {i+1}",
-        'Risk Score': clause.get('risk_score', 0),
-        'Type': clause.get('clause_type', 'Unknown'),
-        'Has Suggestion': clause.get('safer_version', '') != clause.get('clause', '')
-    } for i, clause in enumerate(clauses)])
+    # Create DataFrame for visualization from column arrays
+    count = len(clauses)
+    df = pd.DataFrame({
+        'Clause': [f"Clause {i}" for i in range(1, count + 1)],
+        'Risk Score': np.fromiter((c.get('risk_score', 0) for c in clauses), dtype=np.float64, count=count),
+        'Type': np.array([c.get('clause_type', 'Unknown') for c in clauses], dtype=object),
+        'Has Suggestion': np.fromiter(
+            (c.get('safer_version', '') != c.get('clause', '') for c in clauses), dtype=bool, count=count
+        )
+    })
     
     # Risk distribution
     st.markdown("### Risk Distribution")
-    fig = px.pie(
-        df, 
-        names='Risk Score', 
-        title='Risk Score Distribution',
-        color_discrete_sequence=px.colors.sequential.RdBu_r
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(risk_distribution_chart(tuple(df['Risk Score'])), use_container_width=True)
     
     # Risk by clause type
     st.markdown("### Risk by Clause Type")
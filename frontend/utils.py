@@ -1,94 +1,76 @@
+import io
 import os
 import requests
-from typing import Dict, Any, Optional
-from pathlib import Path
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
+from urllib3.util.retry import Retry
+from typing import BinaryIO, Dict, Any, Iterator
 import json
 
 # API configuration
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8001/api/v1")
 
-def analyze_document(file_path: str) -> Optional[Dict[str, Any]]:
+# Endpoint URLs, built once
+ANALYZE_STREAM_URL = f"{API_BASE_URL}/analyze/stream"
+HEALTH_URL = f"{API_BASE_URL}/health"
+
+# Shared session so connections to the API are kept alive and reused.
+# Failed connections are retried; read errors only for idempotent requests,
+# so an upload that reached the server is never resent.
+_SESSION = requests.Session()
+_SESSION.mount(
+    API_BASE_URL,
+    HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=Retry(total=2, backoff_factor=0.2))
+)
+
+def _post_document(url: str, name: str, f: BinaryIO, **kwargs) -> requests.Response:
+    """POST a file object as multipart form data, streaming it instead of buffering."""
+    encoder = MultipartEncoder(fields={"file": (name, f, "application/octet-stream")})
+    return _SESSION.post(
+        url, data=encoder, headers={"Content-Type": encoder.content_type}, timeout=60, **kwargs
+    )
+
+def analyze_document_bytes_stream(name: str, blob: bytes) -> Iterator[Dict[str, Any]]:
     """
-    Send a document to the API for analysis.
+    Send in-memory document contents to the streaming API and yield results as they arrive.
     
     Args:
-        file_path: Path to the document file
-        
-    Returns:
-        Analysis results as a dictionary with 'overall_risk' and 'clauses' keys
-    """
-    url = f"{API_BASE_URL}/analyze"
+        name: File name, used by the API to pick the document format
+        blob: Raw file contents
     
+    Yields:
+        One dict per analyzed clause, then a dict with an 'overall_risk' key.
+        A dict with a 'detail' key reports an error.
+    """
+    yield from _stream_analysis(name, io.BytesIO(blob))
+
+def _stream_analysis(name: str, f: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """Send a document file object to the streaming API and yield the parsed lines."""
     try:
-        with open(file_path, "rb") as f:
-            files = {"file": (os.path.basename(file_path), f, "application/octet-stream")}
-            response = requests.post(url, files=files, timeout=60)
-            
-        response.raise_for_status()
-        
-        # Get the raw response
-        data = response.json()
-        
-        # Transform the response to match frontend expectations
-        if isinstance(data, list):
-            # If response is a list of clauses
-            clauses = data
-        elif isinstance(data, dict) and 'clauses' in data:
-            # If response already has a 'clauses' key
-            clauses = data['clauses']
-        else:
-            # If single clause response, wrap in a list
-            clauses = [data]
+        with _post_document(ANALYZE_STREAM_URL, name, f, stream=True) as response:
+            if response.status_code != 200:
+                try:
+                    detail = response.json().get("detail", response.text)
+                except ValueError:
+                    detail = response.text
+                yield {"detail": detail}
+                return
             
-        # Calculate overall risk (average of all clause risks)
-        if clauses:
-            overall_risk = sum(float(clause.get('risk_score', 0)) for clause in clauses) / len(clauses)
-        else:
-            overall_risk = 0.0
-            
-        return {
-            'overall_risk': overall_risk,
-            'clauses': clauses
-        }
-        
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+    
     except requests.exceptions.RequestException as e:
         print(f"Error analyzing document: {str(e)}")
-        if hasattr(e, 'response') and e.response is not None:
-            print(f"Response content: {e.response.text}")
-        return None
+        yield {"detail": str(e)}
 
 def get_health() -> bool:
     """Check if the API is healthy."""
     try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=5)
+        response = _SESSION.get(HEALTH_URL, timeout=5)
         if response.status_code == 200:
             health_data = response.json()
             return health_data.get("status") == "ok"
         return False
     except (requests.RequestException, json.JSONDecodeError):
-        return False
-
-def save_uploaded_file(uploaded_file) -> Optional[str]:
-    """
-    Save an uploaded file to a temporary location.
-    
-    Args:
-        uploaded_file: Streamlit UploadedFile object
-        
-    Returns:
-        Path to the saved file or None if failed
-    """
-    try:
-        # Create temp directory if it doesn't exist
-        temp_dir = Path("temp")
-        temp_dir.mkdir(exist_ok=True)
-        
-        # Save file
-        file_path = temp_dir / uploaded_file.name
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-            
-        return str(file_path)
-    except Exception as e:
-        print(f"Error saving file: {str(e)}")
-        return None
\ No newline at end of file
+        return False
\ No newline at end of file